@@ -0,0 +1,115 @@
+import hashlib
+import math
+import os
+from app.redis_client import get_redis
+
+# Idempotency keys map a post fingerprint to the task that renders it.
+IDEMPOTENCY_KEY_PREFIX = "video:idempotency:"
+IDEMPOTENCY_KEY_TTL = 7 * 24 * 60 * 60
+
+# Celery's default queue is a Redis list with this name.
+QUEUE_NAME = os.getenv("CELERY_QUEUE_NAME", "celery")
+
+# Admission limits (override via .env)
+MAX_QUEUE_DEPTH = int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", "50"))
+MAX_BACKLOG_RENDER_SECONDS = float(os.getenv("ADMISSION_MAX_BACKLOG_SECONDS", str(2 * 60 * 60)))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "1"))
+
+# Render cost model: narration length from word count, times how long
+# one second of narration takes to produce (TTS, Whisper, encode).
+WORDS_PER_MINUTE = 150
+RENDER_SECONDS_PER_NARRATION_SECOND = float(os.getenv("RENDER_SECONDS_PER_NARRATION_SECOND", "3.0"))
+RENDER_OVERHEAD_SECONDS = 30.0
+# Assumed cost of a job already sitting in the queue.
+AVERAGE_QUEUED_RENDER_SECONDS = float(os.getenv("AVERAGE_QUEUED_RENDER_SECONDS", "600"))
+
+
+def post_fingerprint(post_data):
+    """Stable idempotency key for a post: SHA-256 of its title and text."""
+    title = post_data.get("title", "")
+    text = post_data.get("text", "")
+    return hashlib.sha256(f"{title}\n{text}".encode("utf-8")).hexdigest()
+
+
+def estimate_render_seconds(post_data):
+    """Rough worker time needed to render a post, from its word count."""
+    words = len(post_data.get("title", "").split()) + len(post_data.get("text", "").split())
+    narration_seconds = words / WORDS_PER_MINUTE * 60
+    return RENDER_OVERHEAD_SECONDS + narration_seconds * RENDER_SECONDS_PER_NARRATION_SECOND
+
+
+def queue_depth():
+    """Number of tasks waiting in the broker queue."""
+    return get_redis().llen(QUEUE_NAME)
+
+
+def oversize_reason(posts):
+    """
+    Why these posts could never be admitted, even with an empty queue.
+    Returns None if they fit the admission limits.
+    """
+    if len(posts) > MAX_QUEUE_DEPTH:
+        return f"At most {MAX_QUEUE_DEPTH} new posts can be queued at once"
+    incoming_seconds = sum(estimate_render_seconds(post) for post in posts)
+    if incoming_seconds > MAX_BACKLOG_RENDER_SECONDS:
+        return (f"Estimated render time {incoming_seconds:.0f}s exceeds the "
+                f"{MAX_BACKLOG_RENDER_SECONDS:.0f}s backlog limit")
+    return None
+
+
+def check_admission(posts):
+    """
+    Decide whether new posts can be enqueued given the current backlog.
+    Posts must already pass oversize_reason(), so the wait is bounded by the
+    queued work. Returns (admitted, retry_after_seconds); retry_after is None
+    when admitted.
+    """
+    depth = queue_depth()
+    backlog_seconds = depth * AVERAGE_QUEUED_RENDER_SECONDS
+    incoming_seconds = sum(estimate_render_seconds(post) for post in posts)
+
+    over_depth = depth + len(posts) - MAX_QUEUE_DEPTH
+    over_seconds = backlog_seconds + incoming_seconds - MAX_BACKLOG_RENDER_SECONDS
+    if over_depth <= 0 and over_seconds <= 0:
+        return True, None
+
+    # Time for the workers to drain enough of the queued backlog to fit this request.
+    excess_seconds = min(max(over_seconds, over_depth * AVERAGE_QUEUED_RENDER_SECONDS), backlog_seconds)
+    return False, max(1, math.ceil(excess_seconds / WORKER_CONCURRENCY))
+
+
+def get_task_for_key(key):
+    return get_redis().get(IDEMPOTENCY_KEY_PREFIX + key)
+
+
+def claim_key(key, task_id, replace=None):
+    """
+    Associate an idempotency key with task_id unless another task holds it.
+    Passing replace=<old task id> takes the key over from a finished task.
+    The check and the write run in one WATCH/MULTI transaction, so concurrent
+    claims cannot both succeed. Returns the task id that owns the key afterwards.
+    """
+    redis_key = IDEMPOTENCY_KEY_PREFIX + key
+
+    def claim(pipe):
+        current = pipe.get(redis_key)
+        if current and current != replace:
+            return current
+        pipe.multi()
+        pipe.set(redis_key, task_id, ex=IDEMPOTENCY_KEY_TTL)
+        return task_id
+
+    # Retried automatically if the key changes between the GET and the SET
+    return get_redis().transaction(claim, redis_key, value_from_callable=True)
+
+
+def release_key(key, task_id):
+    """Drop an idempotency key, but only while it still belongs to task_id."""
+    redis_key = IDEMPOTENCY_KEY_PREFIX + key
+
+    def release(pipe):
+        if pipe.get(redis_key) == task_id:
+            pipe.multi()
+            pipe.delete(redis_key)
+
+    get_redis().transaction(release, redis_key)
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+
+OUTPUT_FOLDER = os.getenv("OUTPUT_FOLDER", "output_videos")
+
+# Renders are written here first, then renamed into OUTPUT_FOLDER. It must be on
+# the same filesystem as OUTPUT_FOLDER so the rename is atomic.
+STAGING_FOLDER_NAME = ".staging"
+
+# One JSON line per published video; uploaders can tail this instead of scanning the folder.
+INDEX_FILE_NAME = "index.jsonl"
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file next to `path`, then rename it into place."""
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class ArtifactStore:
+    """
+    Output folder for finished videos.
+
+    Each video is published as <name>.mp4 with a <name>.jpg thumbnail and a
+    <name>.json sidecar, and is recorded in index.jsonl. Files only appear
+    under their final names once complete.
+    """
+
+    def __init__(self, root=OUTPUT_FOLDER):
+        self.root = root
+        self.staging_folder = os.path.join(root, STAGING_FOLDER_NAME)
+        self.index_path = os.path.join(root, INDEX_FILE_NAME)
+        os.makedirs(self.staging_folder, exist_ok=True)
+
+    def staging_path(self, suffix):
+        """Unique temporary path to render into."""
+        return os.path.join(self.staging_folder, f"{uuid.uuid4().hex}{suffix}")
+
+    def discard(self, *paths):
+        """Remove staged files that were not published."""
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def publish(self, name, staged_video, staged_thumbnail=None, metadata=None):
+        """
+        Move a staged render to its final name and record it.
+        Returns the sidecar dictionary.
+        """
+        video_path = os.path.join(self.root, f"{name}.mp4")
+        thumbnail_path = os.path.join(self.root, f"{name}.jpg")
+        sidecar_path = os.path.join(self.root, f"{name}.json")
+
+        sidecar = dict(metadata or {})
+        sidecar.update({
+            "name": name,
+            "video": os.path.basename(video_path),
+            "thumbnail": None,
+            "sidecar": os.path.basename(sidecar_path),
+            "sha256": file_sha256(staged_video),
+            "size_bytes": os.path.getsize(staged_video),
+            "published_at": time.time(),
+        })
+
+        if staged_thumbnail and os.path.exists(staged_thumbnail):
+            os.replace(staged_thumbnail, thumbnail_path)
+            sidecar["thumbnail"] = os.path.basename(thumbnail_path)
+        os.replace(staged_video, video_path)
+        write_json_atomic(sidecar_path, sidecar)
+
+        # Small appends are atomic, so concurrent workers can share the index.
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(sidecar) + "\n")
+
+        return sidecar
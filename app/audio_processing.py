@@ -0,0 +1,189 @@
+# Post-processing for the Edge-TTS voiceover, done in NumPy on a single decode:
+# silence trimming, optional compression of long pauses, and loudness
+# normalization (EBU R128 / ITU-R BS.1770 style measurement).
+import os
+import subprocess
+import wave
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+
+SAMPLE_RATE = 24000  # Edge-TTS output rate; mono
+
+# Silence detection on 10 ms frames
+FRAME_SECONDS = 0.01
+SILENCE_THRESHOLD_DB = -45.0  # Frames quieter than this (dBFS RMS) count as silence
+EDGE_PADDING_SECONDS = 0.05  # Silence kept before the first and after the last word
+
+# Pauses longer than MAX_SENTENCE_GAP_SECONDS are shortened to it
+COMPRESS_SENTENCE_GAPS = os.getenv("COMPRESS_SENTENCE_GAPS", "1") == "1"
+MAX_SENTENCE_GAP_SECONDS = float(os.getenv("MAX_SENTENCE_GAP_SECONDS", "0.4"))
+
+# Loudness target (typical for short-form social video) and true-peak-ish ceiling
+TARGET_LOUDNESS_LUFS = float(os.getenv("TARGET_LOUDNESS_LUFS", "-14.0"))
+PEAK_CEILING_DB = -1.0
+
+# BS.1770 gating: 400 ms blocks with 75% overlap
+LOUDNESS_BLOCK_SECONDS = 0.4
+LOUDNESS_BLOCK_STEP_SECONDS = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+
+def decode_audio(path, sample_rate=SAMPLE_RATE):
+    """Decode an audio file to a mono float32 array with ffmpeg."""
+    raw = subprocess.run(
+        [FFMPEG_BINARY, "-v", "error", "-i", path, "-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "-"],
+        check=True, capture_output=True
+    ).stdout
+    return np.frombuffer(raw, dtype=np.float32).astype(np.float64)
+
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    """Write mono samples in [-1, 1] as 16-bit PCM WAV."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def frame_levels_db(samples, frame_length):
+    """RMS level in dBFS of each complete frame."""
+    n_frames = len(samples) // frame_length
+    frames = samples[:n_frames * frame_length].reshape(n_frames, frame_length)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def silence_keep_mask(voiced, edge_padding_frames, max_gap_frames=None):
+    """
+    Per-frame keep mask: drops leading/trailing silence (beyond the padding)
+    and, if max_gap_frames is set, the middle of longer internal pauses.
+    """
+    keep = np.zeros(len(voiced), dtype=bool)
+    voiced_frames = np.flatnonzero(voiced)
+    if not len(voiced_frames):
+        return keep
+    first = max(voiced_frames[0] - edge_padding_frames, 0)
+    last = min(voiced_frames[-1] + edge_padding_frames, len(voiced) - 1)
+    keep[first:last + 1] = True
+
+    if max_gap_frames:
+        # Silent runs between first and last voiced frame
+        inner = voiced[voiced_frames[0]:voiced_frames[-1] + 1].astype(np.int8)
+        edges = np.diff(np.concatenate(([1], inner, [1])))
+        run_starts = np.flatnonzero(edges == -1) + voiced_frames[0]
+        run_ends = np.flatnonzero(edges == 1) + voiced_frames[0]
+        long_runs = run_ends - run_starts > max_gap_frames
+        half_gap = max_gap_frames // 2
+        for start, end in zip(run_starts[long_runs], run_ends[long_runs]):
+            # Keep half of the allowed gap on each side of the pause
+            keep[start + half_gap:end - (max_gap_frames - half_gap)] = False
+    return keep
+
+
+def biquad_response(b, a, z):
+    """Complex frequency response of a biquad at points z = exp(-jw)."""
+    return (b[0] + b[1] * z + b[2] * z ** 2) / (a[0] + a[1] * z + a[2] * z ** 2)
+
+
+def k_weighting_response(n, sample_rate):
+    """
+    Complex response of the BS.1770 K-weighting filter (high shelf + high pass)
+    at the rfft bins of an n-point transform. Coefficients are derived for any
+    sample rate the same way libebur128 does.
+    """
+    w = 2 * np.pi * np.fft.rfftfreq(n, d=1.0 / sample_rate) / sample_rate
+    z = np.exp(-1j * w)
+
+    # Stage 1: high shelf, +4 dB above ~1.7 kHz
+    gain_db, q, fc = 3.999843853973347, 0.7071752369554196, 1681.974450955533
+    k = np.tan(np.pi * fc / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = biquad_response(
+        ((vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        z
+    )
+
+    # Stage 2: high pass at ~38 Hz
+    q, fc = 0.5003270373238773, 38.13547087602444
+    k = np.tan(np.pi * fc / sample_rate)
+    a0 = 1 + k / q + k * k
+    high_pass = biquad_response(
+        (1.0, -2.0, 1.0),
+        (1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0),
+        z
+    )
+    return shelf * high_pass
+
+
+def integrated_loudness(samples, sample_rate=SAMPLE_RATE):
+    """Gated integrated loudness in LUFS. Returns None for silent input."""
+    n = len(samples)
+    if not n:
+        return None
+    # Apply the K-weighting filter in the frequency domain
+    weighted = np.fft.irfft(np.fft.rfft(samples) * k_weighting_response(n, sample_rate), n)
+
+    block = min(int(LOUDNESS_BLOCK_SECONDS * sample_rate), n)
+    step = int(LOUDNESS_BLOCK_STEP_SECONDS * sample_rate)
+    energy = np.concatenate(([0.0], np.cumsum(weighted ** 2)))
+    starts = np.arange(0, n - block + 1, step)
+    block_power = (energy[starts + block] - energy[starts]) / block
+    block_loudness = -0.691 + 10 * np.log10(block_power + 1e-20)
+
+    gated = block_power[block_loudness > ABSOLUTE_GATE_LUFS]
+    if not len(gated):
+        return None
+    relative_gate = -0.691 + 10 * np.log10(np.mean(gated)) + RELATIVE_GATE_LU
+    gated = block_power[(block_loudness > ABSOLUTE_GATE_LUFS) & (block_loudness > relative_gate)]
+    return -0.691 + 10 * np.log10(np.mean(gated))
+
+
+def process_tts_audio(input_path, output_path, compress_gaps=COMPRESS_SENTENCE_GAPS,
+                      max_gap=MAX_SENTENCE_GAP_SECONDS, target_lufs=TARGET_LOUDNESS_LUFS):
+    """
+    Decode the voiceover once, trim silence, optionally shorten long pauses,
+    normalize loudness and write the result as WAV to output_path.
+    Returns a dictionary of statistics for the render metadata.
+    """
+    samples = decode_audio(input_path)
+    original_duration = len(samples) / SAMPLE_RATE
+
+    frame_length = int(FRAME_SECONDS * SAMPLE_RATE)
+    voiced = frame_levels_db(samples, frame_length) > SILENCE_THRESHOLD_DB
+    keep_frames = silence_keep_mask(
+        voiced,
+        edge_padding_frames=int(EDGE_PADDING_SECONDS / FRAME_SECONDS),
+        max_gap_frames=int(max_gap / FRAME_SECONDS) if compress_gaps else None
+    )
+    if keep_frames.any():
+        # Samples after the last complete frame follow the last frame's decision
+        keep = np.repeat(keep_frames, frame_length)
+        keep = np.concatenate((keep, np.full(len(samples) - len(keep), keep_frames[-1])))
+        samples = samples[keep]
+
+    loudness = integrated_loudness(samples)
+    gain_db = 0.0
+    if loudness is not None:
+        gain_db = target_lufs - loudness
+        peak = np.max(np.abs(samples))
+        # Don't let the gain push peaks above the ceiling
+        if peak > 0:
+            gain_db = min(gain_db, PEAK_CEILING_DB - 20 * np.log10(peak))
+        samples = samples * 10 ** (gain_db / 20)
+
+    write_wav(output_path, samples)
+    duration = len(samples) / SAMPLE_RATE
+    print(f"✓ Audio processed: {original_duration:.2f}s → {duration:.2f}s, gain {gain_db:+.1f} dB")
+
+    return {
+        'original_duration': round(original_duration, 3),
+        'duration': round(duration, 3),
+        'loudness_lufs': None if loudness is None else round(float(loudness), 2),
+        'gain_db': round(float(gain_db), 2),
+    }
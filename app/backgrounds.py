@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import random
+import subprocess
+from bisect import bisect_right
+
+# Pool of background videos: "path[:weight],path[:weight],..."
+# Falls back to MINECRAFT_CLIP_PATH when unset.
+BACKGROUND_CLIPS = os.getenv("BACKGROUND_CLIPS", "")
+
+# Keyframe indexes are cached here, one JSON file per asset version.
+KEYFRAME_INDEX_FOLDER = os.getenv("KEYFRAME_INDEX_FOLDER", os.path.join("tracking_files", "keyframe_index"))
+
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+
+# Keyframe indexes already loaded by this process, by cache file path
+_loaded_indexes = {}
+
+
+def parse_background_clips(spec, default_path):
+    """Parse a BACKGROUND_CLIPS spec into a list of (path, weight)."""
+    clips = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        path, _, weight = entry.rpartition(":")
+        if not path or not weight.replace(".", "", 1).isdigit():
+            # No weight given (or a Windows drive letter)
+            path, weight = entry, "1"
+        clips.append((path, float(weight)))
+    return clips or [(default_path, 1.0)]
+
+
+def probe_keyframes(path):
+    """
+    List keyframe timestamps of the first video stream with ffprobe.
+    Only packet headers are read, nothing is decoded.
+    """
+    output = subprocess.run(
+        [FFPROBE_BINARY, "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path],
+        check=True, capture_output=True, text=True
+    ).stdout
+
+    keyframes = []
+    last_pts = 0.0
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if not pts_time or pts_time == "N/A":
+            continue
+        pts = float(pts_time)
+        last_pts = max(last_pts, pts)
+        if flags.startswith("K"):
+            keyframes.append(pts)
+    return sorted(keyframes), last_pts
+
+
+def probe_duration(path):
+    """Duration in seconds from ffmpeg's stream info; works where ffprobe isn't installed."""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+    return ffmpeg_parse_infos(path)["duration"]
+
+
+def index_cache_path(path):
+    """Cache file for an asset; changes when the file is replaced or modified."""
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(KEYFRAME_INDEX_FOLDER, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+
+def load_keyframe_index(path):
+    """
+    Return {"keyframes": [...], "duration": seconds} for a background asset.
+    The index is built once with ffprobe and cached on disk.
+    """
+    cache_path = index_cache_path(path)
+    if cache_path in _loaded_indexes:
+        return _loaded_indexes[cache_path]
+
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    else:
+        try:
+            keyframes, duration = probe_keyframes(path)
+        except (OSError, subprocess.CalledProcessError) as e:
+            # No keyframe list: choose() falls back to any start within the duration.
+            # Remembered for this process only, so ffprobe isn't retried (and warned
+            # about) every video but is used once it is installed.
+            print(f"⚠ Could not index keyframes of {path}: {e}; using random start times")
+            try:
+                duration = probe_duration(path)
+            except (OSError, KeyError, TypeError):
+                duration = 0.0
+            index = {"keyframes": [], "duration": duration}
+            _loaded_indexes[cache_path] = index
+            return index
+        index = {"keyframes": keyframes or [0.0], "duration": duration}
+        os.makedirs(KEYFRAME_INDEX_FOLDER, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_path, cache_path)
+        print(f"✓ Indexed {len(index['keyframes'])} keyframes in {path}")
+
+    _loaded_indexes[cache_path] = index
+    return index
+
+
+class BackgroundPool:
+    """Weighted pool of background videos with random, keyframe-aligned start times."""
+
+    def __init__(self, clips):
+        self.clips = clips
+
+    @classmethod
+    def from_env(cls, default_path):
+        return cls(parse_background_clips(BACKGROUND_CLIPS, default_path))
+
+    def choose(self, target_duration, rng=random):
+        """
+        Pick a background and a start time for a video of `target_duration` seconds.
+        The start is a keyframe, so the decoder can seek straight to it, and is
+        early enough that the clip covers the whole video without looping when possible.
+        Without a keyframe index (no ffprobe) any start in that range is used.
+        """
+        paths = [path for path, _ in self.clips]
+        weights = [weight for _, weight in self.clips]
+        path = rng.choices(paths, weights=weights)[0]
+
+        index = load_keyframe_index(path)
+        latest_start = index["duration"] - target_duration
+        if latest_start <= 0:
+            return path, 0.0
+        keyframes = index["keyframes"]
+        if not keyframes:
+            return path, rng.uniform(0.0, latest_start)
+        candidates = keyframes[:bisect_right(keyframes, latest_start)]
+        return path, (rng.choice(candidates) if candidates else 0.0)
@@ -0,0 +1,105 @@
+# Single-pass encoder: composited frames are rendered once and piped into one
+# ffmpeg process, which splits them into every requested output variant.
+import os
+import subprocess
+import tempfile
+import time
+from moviepy.config import FFMPEG_BINARY
+
+
+def build_command(frame_size, fps, audio_path, outputs):
+    """
+    ffmpeg command reading raw RGB frames on stdin plus the audio file, with
+    one split/crop/scale branch and encoder section per output.
+    `outputs` is a list of (path, settings) pairs.
+    """
+    width, height = frame_size
+    branches = [f"[0:v]split={len(outputs)}" + "".join(f"[s{i}]" for i in range(len(outputs)))]
+    for i, (_, settings) in enumerate(outputs):
+        chain = []
+        crop = settings.get('crop')
+        if crop:
+            chain.append(f"crop={crop[0]}:{crop[1]}")
+        size = settings.get('size', frame_size)
+        if tuple(size) != tuple(crop or frame_size):
+            chain.append(f"scale={size[0]}:{size[1]}")
+        chain.append("format=yuv420p")
+        branches.append(f"[s{i}]{','.join(chain)}[v{i}]")
+
+    cmd = [
+        FFMPEG_BINARY, "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{width}x{height}",
+        "-pix_fmt", "rgb24", "-r", str(fps), "-i", "-",
+        "-i", audio_path,
+        "-filter_complex", ";".join(branches),
+    ]
+    for i, (path, settings) in enumerate(outputs):
+        cmd += ["-map", f"[v{i}]", "-map", "1:a",
+                "-c:v", settings['codec'], "-preset", settings['preset']]
+        if 'crf' in settings:
+            cmd += ["-crf", str(settings['crf'])]
+        cmd += ["-threads", str(settings['threads']), "-c:a", settings['audio_codec']]
+        if 'audio_bitrate' in settings:
+            cmd += ["-b:a", settings['audio_bitrate']]
+        cmd += ["-shortest", "-movflags", "+faststart", path]
+    return cmd
+
+
+def write_variants(clip, audio_path, outputs, fps, progress=None):
+    """
+    Render `clip` once and encode it into every output.
+
+    outputs: {variant_name: (path, settings)}; settings hold codec, preset,
+    threads, audio_codec and optionally crf, audio_bitrate, size and crop.
+    `progress`, if given, is called as progress('encode', ...) for every frame
+    and may raise to abort; the ffmpeg process is killed in that case.
+
+    Returns {variant_name: stats} with size, bitrate and throughput.
+    """
+    ordered = list(outputs.items())
+    cmd = build_command(clip.size, fps, audio_path, [output for _, output in ordered])
+
+    frames_total = int(clip.duration * fps)
+    with tempfile.TemporaryFile() as ffmpeg_log:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=ffmpeg_log)
+        started = time.monotonic()
+        try:
+            for index, frame in enumerate(clip.iter_frames(fps=fps, dtype="uint8")):
+                proc.stdin.write(frame[:, :, :3].tobytes())
+                if progress:
+                    frames_encoded = index + 1
+                    elapsed = time.monotonic() - started
+                    eta = (frames_total - frames_encoded) * elapsed / frames_encoded
+                    progress('encode', frames_encoded=frames_encoded, frames_total=frames_total, eta_seconds=eta)
+            proc.stdin.close()
+            return_code = proc.wait()
+        except BrokenPipeError:
+            return_code = proc.wait()
+        except BaseException:
+            # Cancelled or failed mid-render: stop ffmpeg and let the caller discard outputs
+            proc.kill()
+            proc.wait()
+            raise
+        elapsed = time.monotonic() - started
+
+        if return_code != 0:
+            ffmpeg_log.seek(0)
+            raise IOError(f"ffmpeg failed with code {return_code}: {ffmpeg_log.read().decode(errors='replace')}")
+
+    stats = {}
+    for name, (path, settings) in ordered:
+        size_bytes = os.path.getsize(path)
+        stats[name] = {
+            'size': list(settings.get('size', clip.size)),
+            'frames': frames_total,
+            'bytes': size_bytes,
+            'bitrate_kbps': round(size_bytes * 8 / 1000 / clip.duration, 1),
+            # All variants share the pass, so time-based figures are per pass
+            'seconds': round(elapsed, 3),
+            'fps': round(frames_total / elapsed, 2),
+            'realtime_factor': round(clip.duration / elapsed, 3),
+            'output_mb_per_second': round(size_bytes / 1e6 / elapsed, 3),
+        }
+        print(f"  - {name}: {size_bytes / 1e6:.1f} MB, {stats[name]['bitrate_kbps']} kb/s, "
+              f"{stats[name]['fps']} fps ({stats[name]['realtime_factor']}x realtime)")
+    return stats
@@ -0,0 +1,120 @@
+# Process-wide font registry: each font file and size is loaded once and glyph
+# advances are cached, so measuring and wrapping text is plain arithmetic.
+# PIL is imported lazily; this module is safe to import from the API process.
+import os
+import threading
+
+FONT_FOLDER = os.getenv("FONT_FOLDER", "fonts")
+
+# Font role -> candidate file names in FONT_FOLDER (matched case-insensitively)
+FONT_FILES = {
+    'default': ["Arial.ttf"],
+    'luckiest_guy': ["LuckiestGuy-Regular.ttf"],
+}
+
+# Name passed to the renderer when no local default font is found
+FALLBACK_FONT = "Arial"
+
+
+class FontRegistry:
+    """
+    Caches font paths, loaded fonts and per-character advances.
+
+    Widths are the sum of cached glyph advances (kerning is ignored), which is
+    what the subtitle chunker and title wrapper need for layout decisions.
+    """
+
+    def __init__(self, font_folder=FONT_FOLDER):
+        self.font_folder = font_folder
+        self._paths = None
+        self._fonts = {}
+        self._advances = {}
+        self._lock = threading.Lock()
+
+    def font_paths(self):
+        """Resolve font roles to files (once per process)."""
+        if self._paths is not None:
+            return self._paths
+
+        try:
+            available = {name.lower(): name for name in os.listdir(self.font_folder)}
+        except OSError:
+            available = {}
+        paths = {}
+        for role, candidates in FONT_FILES.items():
+            found = next((available[c.lower()] for c in candidates if c.lower() in available), None)
+            paths[role] = os.path.join(self.font_folder, found) if found else None
+        if not paths['default']:
+            paths['default'] = FALLBACK_FONT
+
+        print(f"Using default font: {paths['default']}")
+        print(f"Using Luckiest Guy font: {paths['luckiest_guy'] or 'NOT FOUND - will use default'}")
+        self._paths = paths
+        return paths
+
+    def font(self, path, size):
+        """Loaded FreeType font for (path, size), or PIL's built-in font if it can't be opened."""
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is None:
+            from PIL import ImageFont
+
+            with self._lock:
+                font = self._fonts.get(key)
+                if font is None:
+                    try:
+                        font = ImageFont.truetype(path, size)
+                    except (OSError, TypeError, ValueError):
+                        print(f"⚠ Could not load font {path}, using built-in font")
+                        font = ImageFont.load_default(size)
+                    self._fonts[key] = font
+        return font
+
+    def measure(self, text, path, size):
+        """Width of `text` in pixels."""
+        advances = self._advances.setdefault((path, size), {})
+        width = 0.0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = self.font(path, size).getlength(char)
+            width += advance
+        return width
+
+    def line_height(self, path, size):
+        """Ascent plus descent of the font."""
+        ascent, descent = self.font(path, size).getmetrics()
+        return ascent + descent
+
+    def wrap(self, text, path, size, max_width):
+        """Greedily wrap `text` into lines no wider than max_width (long words get their own line)."""
+        space = self.measure(" ", path, size)
+        lines = []
+        current, current_width = [], 0.0
+        for word in text.split():
+            width = self.measure(word, path, size)
+            if current and current_width + space + width > max_width:
+                lines.append(" ".join(current))
+                current, current_width = [], 0.0
+            current_width += (space if current else 0.0) + width
+            current.append(word)
+        if current:
+            lines.append(" ".join(current))
+        return lines
+
+    def fit(self, text, path, max_size, box, line_spacing=1.1, min_size=12):
+        """
+        Largest font size <= max_size at which the wrapped text fits in box
+        (width, height). Returns (size, lines).
+        """
+        width, height = box
+        size = max_size
+        while True:
+            lines = self.wrap(text, path, size, width)
+            fits = len(lines) * self.line_height(path, size) * line_spacing <= height
+            if (fits and all(self.measure(line, path, size) <= width for line in lines)) or size <= min_size:
+                return size, lines
+            size = max(min_size, int(size * 0.9))
+
+
+FONT_REGISTRY = FontRegistry()
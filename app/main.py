@@ -1,10 +1,49 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from celery.result import AsyncResult
-from app.tasks.tasks import create_video_from_post
+# Tasks are sent by name so this process never imports the video pipeline
+# (whisper/torch, moviepy, ...); only the worker does.
+from app.celery_app import celery_app
+from app.progress import request_cancel
+from app import admission
+import json
 import os
+import time
+import uuid
 
 app = Flask(__name__)
 
+# How often the status stream polls the result backend, and how often it
+# sends a keep-alive comment when nothing changed (seconds).
+STREAM_POLL_INTERVAL = 1.0
+STREAM_KEEPALIVE_INTERVAL = 15.0
+
+# Streams close after this long, and after STREAM_PENDING_TIMEOUT if the task
+# is still PENDING (queued, or an unknown task id); clients can reconnect.
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", "3600"))
+STREAM_PENDING_TIMEOUT = float(os.getenv("STREAM_PENDING_TIMEOUT", "600"))
+
+# Maximum number of posts accepted in one /create/batch request.
+MAX_BATCH_SIZE = 100
+
+CREATE_VIDEO_TASK = "create_video_from_post"
+
+# Tasks in these states no longer hold their idempotency key.
+RETRYABLE_STATES = ('FAILURE', 'REVOKED')
+
+
+def task_payload(task):
+    """Build the JSON status payload for a task."""
+    if task.state == 'PENDING':
+        return {"state": task.state, "status": "Pending..."}
+    if task.state == 'PROGRESS':
+        return {"state": task.state, "progress": task.info}
+    return {"state": task.state, "result": str(task.result)}
+
+
+def is_valid_post(post):
+    return isinstance(post, dict) and isinstance(post.get('title'), str) and isinstance(post.get('text'), str)
+
+
 @app.route('/create', methods=['POST'])
 def create_video_endpoint():
     """
@@ -17,14 +56,132 @@ def create_video_endpoint():
         return jsonify({"error": "Missing 'post_data' in request body"}), 400
 
     post_data = request.json['post_data']
-    task = create_video_from_post.delay(post_data)
-    
+    task = celery_app.send_task(CREATE_VIDEO_TASK, args=[post_data])
+
     return jsonify({"task_id": task.id}), 202
 
+@app.route('/create/batch', methods=['POST'])
+def create_video_batch_endpoint():
+    """
+    API endpoint to create videos for many posts at once.
+    Expects a JSON payload with a "posts" list of {"title", "text"} dictionaries.
+    e.g., {"posts": [{"title": "My story", "text": "AITA for..."}, ...]}
+
+    Each post is keyed by a hash of its title and text, so resubmitting a
+    post returns the existing task instead of rendering it again. Returns
+    429 with a Retry-After header when the render queue is saturated.
+    """
+    body = request.get_json(silent=True)
+    posts = body.get('posts') if isinstance(body, dict) else None
+    if not isinstance(posts, list) or not posts:
+        return jsonify({"error": "Missing 'posts' list in request body"}), 400
+    if len(posts) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} posts per batch"}), 400
+    if not all(is_valid_post(post) for post in posts):
+        return jsonify({"error": "Each post must be an object with string 'title' and 'text'"}), 400
+
+    # Resolve duplicates first so they never count against admission.
+    entries = []
+    new_posts = {}
+    for post in posts:
+        key = admission.post_fingerprint(post)
+        task_id = admission.get_task_for_key(key)
+        stale_task_id = None
+        if task_id and AsyncResult(task_id, app=celery_app).state in RETRYABLE_STATES:
+            stale_task_id, task_id = task_id, None
+        if not task_id and key not in new_posts:
+            new_posts[key] = (post, stale_task_id)
+        entries.append({"idempotency_key": key, "task_id": task_id})
+
+    if new_posts:
+        # Requests that no amount of waiting would admit get no Retry-After.
+        reason = admission.oversize_reason([post for post, _ in new_posts.values()])
+        if reason:
+            return jsonify({"error": reason}), 413
+        admitted, retry_after = admission.check_admission([post for post, _ in new_posts.values()])
+        if not admitted:
+            response = jsonify({"error": "Render queue is saturated", "retry_after": retry_after})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
+
+    # Claim each key before enqueueing; a concurrent request may win the race.
+    owners = {}
+    created = set()
+    for key, (post, stale_task_id) in new_posts.items():
+        candidate_id = str(uuid.uuid4())
+        owners[key] = admission.claim_key(key, candidate_id, replace=stale_task_id)
+        if owners[key] == candidate_id:
+            try:
+                celery_app.send_task(CREATE_VIDEO_TASK, args=[post], task_id=candidate_id)
+            except Exception as e:
+                # The task was never queued; free the key so the post can be resubmitted.
+                admission.release_key(key, candidate_id)
+                return jsonify({"error": f"Could not queue video task: {e}"}), 503
+            created.add(key)
+
+    for entry in entries:
+        key = entry["idempotency_key"]
+        if entry["task_id"] is None:
+            entry["task_id"] = owners[key]
+        # Only the first occurrence in the batch counts as newly created.
+        entry["duplicate"] = key not in created
+        created.discard(key)
+
+    return jsonify({"tasks": entries}), 202
+
 @app.route('/status/<task_id>')
 def task_status(task_id):
-    task = AsyncResult(task_id, app=create_video_from_post.app)
-    if task.state == 'PENDING':
-        return jsonify({"state": task.state, "status": "Pending..."}), 202
+    task = AsyncResult(task_id, app=celery_app)
+    if task.state in ('PENDING', 'PROGRESS'):
+        return jsonify(task_payload(task)), 202
     else:
-        return jsonify({"state": task.state, "result": str(task.result)})
\ No newline at end of file
+        return jsonify(task_payload(task))
+
+@app.route('/status/<task_id>/stream')
+def task_status_stream(task_id):
+    """
+    Server-Sent-Events stream of a task's status.
+    Sends one event each time the status payload changes and closes
+    after the task reaches a final state, or with an "event: timeout"
+    once the stream's time limit is reached.
+    """
+    def events():
+        last_payload = None
+        started = last_sent = time.monotonic()
+        while True:
+            task = AsyncResult(task_id, app=celery_app)
+            payload = task_payload(task)
+            if payload != last_payload:
+                yield f"data: {json.dumps(payload)}\n\n"
+                last_payload = payload
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= STREAM_KEEPALIVE_INTERVAL:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+
+            if task.ready():
+                yield "event: end\ndata: {}\n\n"
+                return
+            elapsed = time.monotonic() - started
+            if elapsed >= STREAM_MAX_SECONDS or (task.state == 'PENDING' and elapsed >= STREAM_PENDING_TIMEOUT):
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            time.sleep(STREAM_POLL_INTERVAL)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=headers)
+
+@app.route('/cancel/<task_id>', methods=['POST'])
+def cancel_task(task_id):
+    """
+    Cancel a queued or running video task.
+    Queued tasks are revoked; a running task stops at its next progress
+    report, closing the video writer and freeing the worker.
+    """
+    task = AsyncResult(task_id, app=celery_app)
+    if task.ready():
+        return jsonify({"error": f"Task already finished with state {task.state}"}), 409
+
+    request_cancel(task_id)
+    celery_app.control.revoke(task_id)
+    return jsonify({"task_id": task_id, "status": "Cancellation requested"}), 202
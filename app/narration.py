@@ -0,0 +1,188 @@
+import json
+import os
+import re
+from bisect import bisect_right
+
+# Common Reddit abbreviations, expanded for better TTS narration.
+DEFAULT_ABBREVIATIONS = {
+    "TIFU": "Today I Fucked Up",
+    "AITA": "Am I the Asshole",
+    "TL;DR": "TLDR",
+    "OP": "Original Poster",
+    "IMO": "In My Opinion",
+    "IMHO": "In My Humble Opinion",
+    "ELI5": "Explain Like I'm Five",
+    "NSFW": "Not Safe For Work",
+    "SFW": "Safe For Work",
+}
+
+# Optional JSON file of extra {"ABBR": "Expansion"} entries
+ABBREVIATIONS_FILE = os.getenv("NARRATION_ABBREVIATIONS_FILE")
+
+URL_PATTERN = r'http\S+|www.\S+'
+URL_REGEX = re.compile(URL_PATTERN)
+
+# Replace periods with commas in the TTS text for a shorter, more natural pause.
+TTS_PUNCTUATION = str.maketrans('.', ',')
+
+WORD_REGEX = re.compile(r"[\w']+")
+
+
+class NormalizedText:
+    """
+    Result of one normalization pass.
+
+    display_text: the original words, with URLs removed
+    spoken_text:  abbreviations expanded (used as the Whisper prompt)
+    tts_text:     spoken_text with TTS pause punctuation applied
+
+    spoken_text and tts_text have identical offsets. The offset map
+    translates positions in them to positions in display_text.
+    """
+
+    def __init__(self, display_text, spoken_text, spans):
+        self.display_text = display_text
+        self.spoken_text = spoken_text
+        self.tts_text = spoken_text.translate(TTS_PUNCTUATION)
+        # (spoken_start, spoken_end, display_start, display_end) per expansion, in order
+        self.spans = spans
+        self._span_starts = [span[0] for span in spans]
+
+    def display_start(self, pos):
+        """Map a start offset in spoken text to display text."""
+        i = bisect_right(self._span_starts, pos) - 1
+        if i < 0:
+            return pos
+        spoken_start, spoken_end, display_start, display_end = self.spans[i]
+        if pos < spoken_end:
+            return display_start
+        return pos - spoken_end + display_end
+
+    def display_end(self, pos):
+        """Map an (exclusive) end offset in spoken text to display text."""
+        i = bisect_right(self._span_starts, pos - 1) - 1
+        if i < 0:
+            return pos
+        spoken_start, spoken_end, display_start, display_end = self.spans[i]
+        if pos <= spoken_end:
+            return display_end
+        return pos - spoken_end + display_end
+
+
+class NarrationNormalizer:
+    """
+    Precompiled narration cleanup: removes URLs and expands abbreviations
+    in a single regex pass over the text.
+    """
+
+    def __init__(self, abbreviations=None):
+        if abbreviations is None:
+            abbreviations = DEFAULT_ABBREVIATIONS
+        self.abbreviations = {abbr.upper(): full_text for abbr, full_text in abbreviations.items()}
+        # Longest first so e.g. IMHO wins over IMO at the same position
+        ordered = sorted(self.abbreviations, key=len, reverse=True)
+        alternation = '|'.join(re.escape(abbr) for abbr in ordered) or '(?!)'
+        # Word boundaries avoid replacing parts of words
+        self.pattern = re.compile(
+            rf'(?P<url>{URL_PATTERN})|\b(?P<abbr>{alternation})\b',
+            flags=re.IGNORECASE
+        )
+
+    def extend(self, abbreviations):
+        """Return a new normalizer with extra (or overridden) abbreviations."""
+        return NarrationNormalizer({**self.abbreviations, **abbreviations})
+
+    def normalize(self, text):
+        display_parts = []
+        spoken_parts = []
+        spans = []
+        display_len = spoken_len = 0
+        last = 0
+
+        for match in self.pattern.finditer(text):
+            between = text[last:match.start()]
+            display_parts.append(between)
+            spoken_parts.append(between)
+            display_len += len(between)
+            spoken_len += len(between)
+            last = match.end()
+
+            if match.lastgroup == 'url':
+                continue
+
+            original = match.group()
+            expansion = self.abbreviations[original.upper()]
+            display_parts.append(original)
+            spoken_parts.append(expansion)
+            spans.append((spoken_len, spoken_len + len(expansion), display_len, display_len + len(original)))
+            display_len += len(original)
+            spoken_len += len(expansion)
+
+        display_parts.append(text[last:])
+        spoken_parts.append(text[last:])
+        return NormalizedText(''.join(display_parts), ''.join(spoken_parts), spans)
+
+
+def load_normalizer():
+    """Build the default normalizer, extended from ABBREVIATIONS_FILE if set."""
+    normalizer = NarrationNormalizer()
+    if ABBREVIATIONS_FILE and os.path.exists(ABBREVIATIONS_FILE):
+        with open(ABBREVIATIONS_FILE, "r", encoding="utf-8") as f:
+            normalizer = normalizer.extend(json.load(f))
+    return normalizer
+
+
+DEFAULT_NORMALIZER = load_normalizer()
+
+
+def normalize_narration(text):
+    return DEFAULT_NORMALIZER.normalize(text)
+
+
+def align_words_to_display(words, normalized, search_window=200):
+    """
+    Replace the text of Whisper word timestamps with the matching display words.
+
+    Each transcribed word is located in the spoken text (searching forward
+    from the previous match) and mapped back through the offset map, so
+    subtitles show e.g. "TIFU" while keeping the timing of "Today I Fucked Up".
+    An expansion becomes a single display word that starts with its first
+    spoken word and ends with its last. Words that cannot be located keep
+    their transcribed text.
+    """
+    spoken = normalized.spoken_text.lower()
+    display = normalized.display_text
+    cursor = 0
+    display_cursor = 0
+    aligned = []
+
+    for word in words:
+        core = WORD_REGEX.search(word['word'].lower())
+        match = None
+        if core:
+            # Whole words only, so e.g. "am" can't match inside "camera"
+            match = re.compile(rf"(?<![\w']){re.escape(core.group())}(?![\w'])").search(spoken, cursor)
+        if match is None or match.start() > cursor + search_window:
+            aligned.append(dict(word))
+            continue
+
+        # Include trailing punctuation from the source text
+        pos = match.start()
+        end = match.end()
+        while end < len(spoken) and not spoken[end].isspace():
+            end += 1
+
+        start = max(normalized.display_start(pos), display_cursor)
+        stop = normalized.display_end(end)
+        text = display[start:stop].strip() if stop > start else ''
+        display_cursor = max(display_cursor, stop)
+        cursor = end
+
+        if aligned and not WORD_REGEX.search(text):
+            # Rest of an expansion, or only its trailing punctuation: extend the previous display word
+            aligned[-1]['word'] += text
+            aligned[-1]['end'] = max(aligned[-1]['end'], word['end'])
+            continue
+        aligned.append({**word, 'word': text})
+
+    return aligned
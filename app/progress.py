@@ -0,0 +1,71 @@
+import time
+from app.redis_client import get_redis
+
+# Cancel flags live in Redis so every worker process can see them,
+# not just the one that received a revoke broadcast.
+CANCEL_KEY_PREFIX = "render:cancel:"
+CANCEL_KEY_TTL = 24 * 60 * 60
+
+# Minimum seconds between two PROGRESS updates (and cancel checks) for a task.
+PROGRESS_MIN_INTERVAL = 0.5
+
+
+class RenderCancelled(Exception):
+    """Raised inside the render pipeline when the task has been cancelled."""
+
+
+def request_cancel(task_id):
+    """Flag a task for cancellation. The task stops at its next progress report."""
+    get_redis().set(CANCEL_KEY_PREFIX + task_id, "1", ex=CANCEL_KEY_TTL)
+
+
+def is_cancel_requested(task_id):
+    return bool(get_redis().exists(CANCEL_KEY_PREFIX + task_id))
+
+
+def clear_cancel(task_id):
+    get_redis().delete(CANCEL_KEY_PREFIX + task_id)
+
+
+class TaskProgress:
+    """
+    Progress callback for a bound Celery task.
+
+    Called as progress(stage, **info) from the video pipeline. Publishes a
+    PROGRESS state through task.update_state and raises RenderCancelled
+    when a cancel has been requested. Frame-level updates are throttled;
+    stage changes are always published.
+    """
+
+    def __init__(self, task, parts=1, min_interval=PROGRESS_MIN_INTERVAL):
+        self.task = task
+        self.parts = parts
+        self.part = 0
+        self.min_interval = min_interval
+        self._stage = None
+        self._last_publish = 0.0
+
+    def set_part(self, part):
+        self.part = part
+
+    def check_cancelled(self):
+        if is_cancel_requested(self.task.request.id):
+            raise RenderCancelled(f"Task {self.task.request.id} was cancelled")
+
+    def __call__(self, stage, frames_encoded=None, frames_total=None, eta_seconds=None):
+        now = time.monotonic()
+        if stage == self._stage and now - self._last_publish < self.min_interval:
+            return
+        self._stage = stage
+        self._last_publish = now
+
+        self.check_cancelled()
+
+        meta = {"stage": stage, "part": self.part, "parts": self.parts}
+        if frames_total:
+            meta["frames_encoded"] = frames_encoded
+            meta["frames_total"] = frames_total
+            meta["percent"] = round(100.0 * frames_encoded / frames_total, 1)
+        if eta_seconds is not None:
+            meta["eta_seconds"] = round(eta_seconds, 1)
+        self.task.update_state(state="PROGRESS", meta=meta)
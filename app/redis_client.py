@@ -0,0 +1,13 @@
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Return a shared Redis client for the broker instance (created on first use)."""
+    import redis
+
+    return redis.Redis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        decode_responses=True
+    )
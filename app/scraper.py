@@ -1,15 +1,20 @@
-import praw
 from dotenv import load_dotenv
+from functools import lru_cache
 import os
 
 load_dotenv()
 
-# Initialize Reddit client
-reddit = praw.Reddit(
-    client_id=os.getenv("REDDIT_CLIENT_ID"),
-    client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-    user_agent=os.getenv("REDDIT_USER_AGENT")
-)
+
+@lru_cache(maxsize=1)
+def get_reddit_client():
+    """Initialize the Reddit client on first use."""
+    import praw
+
+    return praw.Reddit(
+        client_id=os.getenv("REDDIT_CLIENT_ID"),
+        client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+        user_agent=os.getenv("REDDIT_USER_AGENT")
+    )
 
 # Path to tracking folder
 TRACKING_FOLDER = "tracking_files"
@@ -37,7 +42,7 @@ def get_reddit_posts(subreddits, limit=3):
     seen_posts = load_seen_ids()
 
     for sub in subreddits:
-        subreddit = reddit.subreddit(sub)
+        subreddit = get_reddit_client().subreddit(sub)
         for post in subreddit.top(time_filter="day", limit=limit * 3):
             if post.id not in seen_posts:  # skip if already scraped
                 seen_posts.add(post.id)
@@ -1,9 +1,16 @@
 # app/tasks/video_tasks.py
 from celery import shared_task
+from celery.exceptions import Ignore
 import math
 from celery.utils.log import get_task_logger
+from app.progress import TaskProgress, RenderCancelled, clear_cancel
+from app.admission import post_fingerprint
+from app.artifacts import ArtifactStore
 from app.scripter import generate_script_with_gemini
-from app.video_maker import make_video_from_script, sanitize_filename, clean_text_for_narration
+from app.video_maker import (
+    make_video_from_script, sanitize_filename, clean_text_for_narration,
+    ENCODER_PROFILE, OUTPUT_VARIANTS, RENDER_VARIANTS
+)
 import os
 
 logger = get_task_logger(__name__)
@@ -45,6 +52,9 @@ def split_script_into_parts(script, num_parts):
 def create_video_from_post(self, post_data):
     """
     Celery task to generate a full video from a Reddit post dictionary.
+
+    While running, the task reports a PROGRESS state with the current stage,
+    part and frame counts. It stops cleanly if cancelled via app.progress.
     """
     title = post_data.get("title", "Untitled")
     text = post_data.get("text", "")
@@ -52,13 +62,17 @@ def create_video_from_post(self, post_data):
     # Clean the text to remove URLs before sending to Gemini
     cleaned_text = clean_text_for_narration(text)
     text_content = f"{title}\n{cleaned_text}"
+    # Output names include the post fingerprint so posts with the same title don't collide
+    post_key = post_fingerprint(post_data)
+    progress = TaskProgress(self)
     try:
+        progress('script')
         logger.info(f"TASK STARTED: Generating script for post: {title[:50]}...")
         script = generate_script_with_gemini(text_content)
 
         if not script:
-            logger.error(f"TASK FAILED: Could not generate script for post: {title}")
-            return f"Failed to generate script for {title}"
+            # Fail the task (rather than return) so its idempotency key can be reclaimed
+            raise RuntimeError(f"TASK FAILED: Could not generate script for post: {title}")
 
         # --- Video Splitting Logic ---
         word_count = len(script.split())
@@ -75,6 +89,7 @@ def create_video_from_post(self, post_data):
         logger.info(f"Estimated narration: {narration_duration_minutes:.2f} mins. Splitting into {num_parts} part(s).")
 
         script_parts = split_script_into_parts(script, num_parts)
+        progress.parts = len(script_parts)
 
         script_content = f"Title:\n{title}\n\n{script}\n"
         save_to_tracking_file("generated_scripts.txt", script_content)
@@ -82,34 +97,67 @@ def create_video_from_post(self, post_data):
 
         for i, part_script in enumerate(script_parts):
             part_num = i + 1
+            progress.set_part(part_num)
             logger.info(f"--- Creating video for Part {part_num}/{len(script_parts)} ---")
 
-            output_folder = "output_videos"
-            os.makedirs(output_folder, exist_ok=True)
-            sanitized_title = sanitize_filename(title[:30])
+            store = ArtifactStore()
+            artifact_name = f"{sanitize_filename(title[:30])}_{post_key[:12]}"
             
             if len(script_parts) > 1:
-                video_filename = os.path.join(output_folder, f"{sanitized_title}_part{part_num}.mp4")
+                artifact_name += f"_part{part_num}"
                 # On-screen title: "(Part 1) My Story"
                 on_screen_title = f"(Part {part_num}) {title}"
                 # Narration script: "My Story, Part 1. The rest of the story..."
                 narration_script = f"{title}, Part {part_num}.\n\n{part_script}"
             else:
-                video_filename = os.path.join(output_folder, f"{sanitized_title}.mp4")
                 on_screen_title = title
                 narration_script = f"{title}\n\n{part_script}"
 
             tiktok_name = os.getenv("TIKTOK_HANDLE", "@YourTikTokHandle")
 
-            make_video_from_script(title_text=on_screen_title, narration_script=narration_script, 
-                                   video_name=video_filename, tiktok_name=tiktok_name)
-            logger.info(f"TASK PART COMPLETE: Video '{video_filename}' created successfully.")
+            # Render into staging, then publish atomically under the final name.
+            # Extra variants (RENDER_VARIANTS) come out of the same encode pass.
+            staged_video = store.staging_path(".mp4")
+            staged_thumbnail = store.staging_path(".jpg")
+            staged_variants = {name: store.staging_path(".mp4") for name in RENDER_VARIANTS}
+            try:
+                render_info = make_video_from_script(title_text=on_screen_title, narration_script=narration_script, 
+                                                     video_name=staged_video, tiktok_name=tiktok_name,
+                                                     progress=progress, thumbnail_name=staged_thumbnail,
+                                                     variant_files=staged_variants)
+                variant_stats = render_info.pop("variants")
+                metadata = {
+                    "title": title,
+                    "post_key": post_key,
+                    "task_id": self.request.id,
+                    "part": part_num,
+                    "parts": len(script_parts),
+                    **render_info,
+                }
+                artifact = store.publish(artifact_name, staged_video, staged_thumbnail, metadata={
+                    **metadata, "variant": "main", "encode": variant_stats["main"],
+                })
+                for name, staged_path in staged_variants.items():
+                    store.publish(f"{artifact_name}_{name}", staged_path, metadata={
+                        **metadata, "variant": name, "encode": variant_stats[name],
+                        "encoder": {**ENCODER_PROFILE, **OUTPUT_VARIANTS[name]},
+                    })
+            finally:
+                store.discard(staged_video, staged_thumbnail, *staged_variants.values())
+            logger.info(f"TASK PART COMPLETE: Video '{artifact['video']}' published successfully.")
 
         return f"Created {len(script_parts)} video(s) for post '{title}'"
+    except RenderCancelled:
+        logger.warning(f"TASK CANCELLED: Stopped video creation for '{title}' at part {progress.part}.")
+        self.backend.mark_as_revoked(self.request.id, reason="cancelled by user", request=self.request)
+        # Ignore keeps Celery from overwriting the REVOKED state on return.
+        raise Ignore()
     except Exception as e:
         logger.error(f"An unexpected error occurred while creating video for '{title}': {e}", exc_info=True)
         # This will mark the task as FAILED in Flower and other monitors.
         raise
+    finally:
+        clear_cancel(self.request.id)
 
 @shared_task(name="ping")
 def ping():
@@ -1,33 +1,29 @@
+# Heavy dependencies (whisper/torch, moviepy, edge_tts, PIL, numpy) are imported
+# inside the functions that use them, so importing this module stays cheap for
+# the web process and for the worker before it forks.
 import os
 from dotenv import load_dotenv
 import tempfile
 import time
-import edge_tts
 import asyncio
-from moviepy import (
-    TextClip,
-    AudioFileClip,
-    CompositeVideoClip,
-    VideoFileClip,
-    concatenate_videoclips,
-    ImageClip
-)
-from PIL import Image, ImageDraw
 import re
-import whisper
-import numpy as np
 import requests
+from app.narration import URL_REGEX, normalize_narration, align_words_to_display
+from app.backgrounds import BackgroundPool
+from app.fonts import FONT_REGISTRY
+
+INVALID_FILENAME_CHARS = re.compile(r'[\\/*?:"<>|]')
 
 def sanitize_filename(filename: str) -> str:
     """Remove invalid characters from a filename for Windows."""
-    filename = re.sub(r'[\\/*?:"<>|]', "", filename)  # Remove invalid chars
+    filename = INVALID_FILENAME_CHARS.sub("", filename)  # Remove invalid chars
     filename = filename.strip()  # Remove leading/trailing spaces
     return filename
 
 def clean_text_for_narration(text: str) -> str:
     """Removes URLs and other artifacts from text before narration."""
     # Remove URLs
-    text = re.sub(r'http\S+|www.\S+', '', text, flags=re.MULTILINE)
+    text = URL_REGEX.sub('', text)
     # You can add other cleaning steps here, like removing markdown
     return text.strip()
 
@@ -47,6 +43,7 @@ OUTPUT_SIZE = (1080, 1920)  # Portrait mode
 # Font size settings (customize these!)
 TITLE_FONT_SIZE = 55  # Font size for title on card
 TIKTOK_HANDLE_FONT_SIZE = 32  # Font size for TikTok handle
+TITLE_LINE_SPACING = 1.1  # Line height multiplier for the wrapped title
 SUBTITLE_FONT_SIZE = 80  # Font size for subtitles
 SUBTITLE_STROKE_WIDTH = 4  # Outline thickness for subtitles
 
@@ -62,6 +59,43 @@ SUBTITLE_VERTICAL_POSITION = OUTPUT_SIZE[1] - 400  # 400px from bottom (default)
 # Horizontal position: "center", "left", "right", or ("center", SUBTITLE_VERTICAL_POSITION)
 SUBTITLE_HORIZONTAL_POSITION = "center"  # Keep centered horizontally
 
+# Subtitle chunking settings
+SUBTITLE_MAX_WIDTH = OUTPUT_SIZE[0] - 100 - 2 * SUBTITLE_STROKE_WIDTH  # Max line width in pixels
+SUBTITLE_MAX_WORDS = 5  # Max words per chunk
+SUBTITLE_PAUSE_THRESHOLD = 0.35  # A pause longer than this (seconds) always starts a new chunk
+SUBTITLE_MIN_GAP = 0.1  # Gaps shorter than this (seconds) between chunks are closed
+SUBTITLE_MIN_DURATION = 0.1  # Shortest time (seconds) a chunk stays on screen
+SUBTITLE_BREAK_PUNCTUATION = ".,!?;:"  # A word ending in one of these ends a chunk
+
+# Video encoding settings (recorded in each video's metadata sidecar)
+# preset='ultrafast' -> Greatly speeds up encoding at the cost of a larger file size.
+# threads=10 -> Increase if your CPU has more cores.
+OUTPUT_FPS = 24
+ENCODER_PROFILE = {
+    'fps': OUTPUT_FPS,
+    'codec': 'libx264',
+    'audio_codec': 'aac',
+    'threads': 10,
+    'preset': 'ultrafast',
+}
+
+# Extra output variants, encoded from the same composited frames as the main
+# video in one pass (TTS, Whisper and compositing run once).
+# Enable with e.g. RENDER_VARIANTS=preview_720p,square in .env
+# size -> output resolution; crop -> centered crop of the 1080x1920 frame before scaling.
+OUTPUT_VARIANTS = {
+    'preview_720p': {'size': (720, 1280), 'crf': 28, 'audio_bitrate': '96k'},
+    'square': {'size': (1080, 1080), 'crop': (1080, 1080)},
+}
+RENDER_VARIANTS = [name.strip() for name in os.getenv("RENDER_VARIANTS", "").split(",") if name.strip()]
+# Checked at import so a typo stops the worker at startup, not every task after TTS and Whisper
+_unknown_variants = [name for name in RENDER_VARIANTS if name not in OUTPUT_VARIANTS]
+if _unknown_variants:
+    raise ValueError(
+        f"Unknown RENDER_VARIANTS {', '.join(_unknown_variants)}; "
+        f"available: {', '.join(OUTPUT_VARIANTS)}"
+    )
+
 # Whisper model (loaded once)
 WHISPER_MODEL = None
 
@@ -70,26 +104,97 @@ def load_whisper_model():
     global WHISPER_MODEL
     if WHISPER_MODEL is None:
         print("Loading Whisper model (this may take a moment)...")
+        import whisper
         WHISPER_MODEL = whisper.load_model("base")  # Options: tiny, base, small, medium, large
         print("✓ Whisper model loaded")
     return WHISPER_MODEL
 
-def group_words_into_chunks(word_timestamps, words_per_chunk=3):
-    """Group word timestamps into chunks for subtitle display."""
-    chunks = []
-    
-    for i in range(0, len(word_timestamps), words_per_chunk):
-        chunk_words = word_timestamps[i:i + words_per_chunk]
-        
-        if chunk_words:
-            chunk = {
-                'text': ' '.join([w['word'] for w in chunk_words]),
-                'start': chunk_words[0]['start'],
-                'end': chunk_words[-1]['end']
-            }
-            chunks.append(chunk)
-    
-    return chunks
+def measure_word_widths(words, font_path, font_size=SUBTITLE_FONT_SIZE):
+    """Rendered width in pixels of each word, from the registry's cached glyph advances."""
+    import numpy as np
+
+    return np.array([FONT_REGISTRY.measure(w, font_path, font_size) for w in words], dtype=float)
+
+
+def render_text_image(text, font_path, font_size, color, stroke_width=0, stroke_color=None):
+    """Render one line of text to an RGBA array sized from the registry's metrics."""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    font = FONT_REGISTRY.font(font_path, font_size)
+    width = int(FONT_REGISTRY.measure(text, font_path, font_size)) + 2 * stroke_width + 2
+    height = FONT_REGISTRY.line_height(font_path, font_size) + 2 * stroke_width
+    img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    ImageDraw.Draw(img).text(
+        (stroke_width, stroke_width), text, font=font, fill=color,
+        stroke_width=stroke_width, stroke_fill=stroke_color
+    )
+    return np.array(img)
+
+
+def group_words_into_chunks(word_timestamps, widths=None, space_width=0.0,
+                            max_width=SUBTITLE_MAX_WIDTH, max_words=SUBTITLE_MAX_WORDS,
+                            pause_threshold=SUBTITLE_PAUSE_THRESHOLD, min_gap=SUBTITLE_MIN_GAP):
+    """
+    Group word timestamps into chunks for subtitle display.
+
+    A chunk ends after a pause longer than `pause_threshold`, after
+    punctuation, or when the next word would exceed `max_width` pixels
+    (given per-word `widths`) or `max_words`. Gaps shorter than `min_gap`
+    between chunks are closed so no blank frames flash in between.
+    """
+    import numpy as np
+
+    words = [w for w in word_timestamps if w['word']]
+    n = len(words)
+    if not n:
+        return []
+
+    starts = np.fromiter((w['start'] for w in words), dtype=float, count=n)
+    ends = np.fromiter((w['end'] for w in words), dtype=float, count=n)
+    if widths is None:
+        widths = np.zeros(n)
+    else:
+        widths = np.asarray([width for width, w in zip(widths, word_timestamps) if w['word']], dtype=float)
+
+    # Hard breaks: long pauses and punctuation
+    gaps = starts[1:] - ends[:-1]
+    punctuated = np.fromiter((w['word'][-1] in SUBTITLE_BREAK_PUNCTUATION for w in words[:-1]), dtype=bool, count=n - 1)
+    breaks = np.flatnonzero((gaps > pause_threshold) | punctuated) + 1
+    segment_starts = np.concatenate(([0], breaks))
+    segment_ends = np.concatenate((breaks, [n]))
+
+    # Split segments by width: advance[j] - advance[i] is the width of words i..j-1 plus a space each
+    advance = np.concatenate(([0.0], np.cumsum(widths + space_width)))
+    chunk_starts = []
+    for segment_start, segment_end in zip(segment_starts, segment_ends):
+        i = segment_start
+        while i < segment_end:
+            j = np.searchsorted(advance, advance[i] + max_width + space_width, side='right') - 1
+            j = min(max(j, i + 1), segment_end, i + max_words)
+            chunk_starts.append(i)
+            i = j
+    chunk_starts = np.asarray(chunk_starts)
+    chunk_ends = np.concatenate((chunk_starts[1:], [n]))
+
+    chunk_start_times = starts[chunk_starts]
+    chunk_end_times = ends[chunk_ends - 1]
+    # Close small gaps (and overlaps) by extending each chunk to the next one
+    next_starts = chunk_start_times[1:]
+    close = next_starts - chunk_end_times[:-1] < min_gap
+    chunk_end_times[:-1] = np.where(close, next_starts, chunk_end_times[:-1])
+    chunk_end_times = np.maximum(chunk_end_times, chunk_start_times + SUBTITLE_MIN_DURATION)
+    # ...but never into the next chunk, which is drawn at the same position
+    chunk_end_times[:-1] = np.minimum(chunk_end_times[:-1], chunk_start_times[1:])
+
+    return [
+        {
+            'text': ' '.join(w['word'] for w in words[a:b]),
+            'start': float(start),
+            'end': float(end)
+        }
+        for a, b, start, end in zip(chunk_starts, chunk_ends, chunk_start_times, chunk_end_times)
+    ]
 
 
 def detect_narrator_gender(text):
@@ -147,26 +252,14 @@ Response (one word only):"""
 
 def expand_abbreviations_for_tts(text):
     """Expands common Reddit abbreviations in text for better TTS narration."""
-    abbreviations = {
-        "TIFU": "Today I Fucked Up",
-        "AITA": "Am I the Asshole",
-        "TL;DR": "TLDR",
-        "OP": "Original Poster",
-        "IMO": "In My Opinion",
-        "IMHO": "In My Humble Opinion",
-        "ELI5": "Explain Like I'm Five",
-        "NSFW": "Not Safe For Work",
-        "SFW": "Safe For Work",
-    }
-    # This regex ensures we only replace whole words
-    for abbr, full_text in abbreviations.items():
-        # Use a word boundary regex to avoid replacing parts of words
-        text = re.sub(r'\b' + re.escape(abbr) + r'\b', full_text, text, flags=re.IGNORECASE)
-    return text
+    # Single precompiled pass; see app.narration for the dictionary
+    return normalize_narration(text).spoken_text
 
 
 async def generate_tts_async(text, filename, voice_id):
     """Generate speech using Edge-TTS (async)"""
+    import edge_tts
+
     # The `edge-tts` library does not support custom SSML tags like `<break>`.
     # However, it does support rate, volume, and pitch adjustments via its constructor.
     # We'll increase the rate by 15% for a more engaging pace.
@@ -175,20 +268,22 @@ async def generate_tts_async(text, filename, voice_id):
     await communicate.save(filename)
 
 
-def text_to_speech(text, filename="voiceover.mp3"):
-    """Generate speech and return the audio file path."""
+def text_to_speech(text, filename="voiceover.mp3", speech_text=None):
+    """
+    Generate speech and return the audio file path.
+    `speech_text` is the prepared TTS text; it is derived from `text` if not given.
+    """
     try:
         # Detect narrator gender and select appropriate voice
         voice_id = detect_narrator_gender(text)
 
-        # Create a version of the script with abbreviations expanded for narration
-        speech_text = expand_abbreviations_for_tts(text)
-        # Replace periods with commas for a shorter, more natural pause.
-        speech_text_with_commas = speech_text.replace('.', ',')
+        # Abbreviations expanded and periods replaced with commas for a shorter, more natural pause.
+        if speech_text is None:
+            speech_text = normalize_narration(text).tts_text
 
         # Generate with Edge-TTS at a faster rate
         print(f"Generating voiceover with {voice_id} (with optimized pauses)...")
-        asyncio.run(generate_tts_async(speech_text_with_commas, filename, voice_id))
+        asyncio.run(generate_tts_async(speech_text, filename, voice_id))
 
         print(f"Voiceover saved as {filename}")
         return filename
@@ -240,35 +335,46 @@ def get_actual_title_duration(transcription_result, title_text):
     return title_end_time
 
 
-def loop_video_to_duration(video_clip, target_duration):
-    """Loop a video clip to match the target duration."""
+def loop_video_to_duration(video_clip, target_duration, start=0.0):
+    """Loop a video clip to match the target duration, starting `start` seconds in."""
+    from moviepy import concatenate_videoclips
+
     video_duration = video_clip.duration
     
-    if video_duration >= target_duration:
+    if video_duration - start >= target_duration:
         # If video is longer than needed, just trim it
-        return video_clip.subclipped(0, target_duration)
+        return video_clip.subclipped(start, start + target_duration)
     
+    # Play from the start offset to the end, then loop from the beginning
+    clips_to_loop = [video_clip.subclipped(start)]
+    remaining = target_duration - (video_duration - start)
+
     # Calculate how many times we need to loop
-    num_loops = int(target_duration / video_duration) + 1
+    num_loops = int(remaining / video_duration) + 1
     
     # Create copies of the clip for looping
-    clips_to_loop = []
     for _ in range(num_loops):
         clips_to_loop.append(video_clip.copy())
     
     looped = concatenate_videoclips(clips_to_loop, method="compose")
     
-    # Trim to exact duration
-    final_clip = looped.subclipped(0, target_duration)
-    
-    # Clean up intermediate clips
-    looped.close()
-    
-    return final_clip
+    # Trim to exact duration.
+    # Don't close `looped`: the trimmed clip still renders through it.
+    return looped.subclipped(0, target_duration)
+
+
+def report_progress(progress, stage):
+    """Report a pipeline stage change if a progress callback was given."""
+    if progress:
+        progress(stage)
 
 
 def create_title_card(title_text, tiktok_name, font_path, duration):
-    """Create a stylized title card with rounded corners and shadow."""
+    """Create a stylized title card with rounded corners and shadow, drawn as a single image."""
+    import numpy as np
+    from moviepy import ImageClip
+    from PIL import Image, ImageDraw
+
     # Card dimensions
     card_width = 900
     card_height = 400
@@ -309,65 +415,44 @@ def create_title_card(title_text, tiktok_name, font_path, duration):
         fill="black"
     )
 
-    # Use a temporary file for the card image to avoid race conditions
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_card:
-        card_path = temp_card.name
-
-    img.save(card_path)
-    
-    # Create ImageClip from the card
-    card_clip = ImageClip(card_path).with_duration(duration).with_position("center")
-    
     # --- Use a better font for the title and handle ---
     title_font = font_path.get('luckiest_guy') or font_path.get('default')
     handle_font = font_path.get('default') # Keep handle font simple
 
-    # Create TikTok handle text (top-left of card)
-    try:
-        tiktok_text = TextClip(
-            text=tiktok_name, 
-            font_size=TIKTOK_HANDLE_FONT_SIZE, 
-            color="black", 
-            font=handle_font,
-        ).with_duration(duration).with_position(
-            (pfp_position[0] + pfp_radius + 15, pfp_position[1] - (TIKTOK_HANDLE_FONT_SIZE / 2))
-        )
-    except Exception as e:
-        print(f"Error creating TikTok handle text clip: {e}")
-        tiktok_text = None
-    
-    # Create title text (center of card)
-    try:
-        title_clip = TextClip(
-            text=title_text,
-            font_size=TITLE_FONT_SIZE,
-            color="black",
-            font=title_font,
-            size=(card_width - 80, card_height - 40),
-            method="caption"
-        ).with_duration(duration).with_position("center")
-    except Exception as e:
-        print(f"Error creating title text clip: {e}")
-        title_clip = None
-    
-    # Combine card and text
-    clips = [card_clip]
-    if tiktok_text:
-        clips.append(tiktok_text)
-    if title_clip:
-        clips.append(title_clip)
-    
-    final_card = CompositeVideoClip(clips, size=OUTPUT_SIZE)
+    # TikTok handle, to the right of the PFP
+    handle_face = FONT_REGISTRY.font(handle_font, TIKTOK_HANDLE_FONT_SIZE)
+    draw.text(
+        (pfp_position[0] + pfp_radius + 15, pfp_position[1]),
+        tiktok_name, font=handle_face, fill="black", anchor="lm"
+    )
+
+    # Title, wrapped (and shrunk if needed) to fit the card below the handle row
+    box_left = shadow_offset + 40
+    box_top = pfp_position[1] + pfp_radius + 15
+    box_width = card_width - 80
+    box_height = shadow_offset + card_height - 20 - box_top
+    title_size, lines = FONT_REGISTRY.fit(
+        title_text, title_font, TITLE_FONT_SIZE, (box_width, box_height), line_spacing=TITLE_LINE_SPACING
+    )
+    title_face = FONT_REGISTRY.font(title_font, title_size)
+    line_height = FONT_REGISTRY.line_height(title_font, title_size) * TITLE_LINE_SPACING
+    y = box_top + (box_height - line_height * len(lines)) / 2
+    for line in lines:
+        x = box_left + (box_width - FONT_REGISTRY.measure(line, title_font, title_size)) / 2
+        draw.text((x, y), line, font=title_face, fill="black")
+        y += line_height
 
-    # Clean up the temporary image file after creating the clip
-    if os.path.exists(card_path):
-        os.remove(card_path)
+    return ImageClip(np.array(img)).with_duration(duration).with_position("center")
 
-    return final_card
 
+def create_subtitle_clips_with_whisper(transcription_result, font_path, title_duration, normalized=None):
+    """
+    Create synchronized subtitle clips using Whisper word timestamps.
+    If `normalized` (a NormalizedText) is given, subtitles show the original
+    script words while timing comes from the spoken ones.
+    """
+    from moviepy import ImageClip
 
-def create_subtitle_clips_with_whisper(transcription_result, font_path, title_duration):
-    """Create synchronized subtitle clips using Whisper word timestamps."""
     # The transcription is already done. We just need to extract the words.
     word_timestamps = []
     for segment in transcription_result.get('segments', []):
@@ -379,6 +464,9 @@ def create_subtitle_clips_with_whisper(transcription_result, font_path, title_du
                     'end': word_info.get('end', 0)
                 })
 
+    if normalized is not None:
+        word_timestamps = align_words_to_display(word_timestamps, normalized)
+
     print(f"\n=== SUBTITLE DEBUG ===")
     print(f"Total words transcribed: {len(word_timestamps)}")
     print(f"Title duration: {title_duration:.2f}s")
@@ -399,16 +487,19 @@ def create_subtitle_clips_with_whisper(transcription_result, font_path, title_du
         print("WARNING: No words found after title duration, using all words")
         words_after_title = word_timestamps
     
-    # Group words into chunks (3 words per subtitle)
-    chunks = group_words_into_chunks(words_after_title, words_per_chunk=3)
-    
+    # Use Luckiest Guy font if available
+    subtitle_font = font_path.get('luckiest_guy') or font_path.get('default')
+    print(f"Using subtitle font: {subtitle_font}")
+
+    # Group words into chunks by pauses, punctuation and measured line width
+    widths = measure_word_widths([w['word'] for w in words_after_title], subtitle_font)
+    space_width = measure_word_widths([' '], subtitle_font)[0]
+    chunks = group_words_into_chunks(words_after_title, widths=widths, space_width=space_width)
+
     print(f"Total chunks created: {len(chunks)}")
     
     subtitle_clips = []
     
-    # Use Luckiest Guy font if available
-    subtitle_font = font_path.get('luckiest_guy') or font_path.get('default')
-    print(f"Using subtitle font: {subtitle_font}")
     
     for i, chunk in enumerate(chunks):
         start_time = chunk['start']
@@ -416,16 +507,12 @@ def create_subtitle_clips_with_whisper(transcription_result, font_path, title_du
         
         # Create subtitle clip with Luckiest Guy font
         try:
-            subtitle = TextClip(
-                text=chunk['text'],
-                font_size=SUBTITLE_FONT_SIZE,
-                color="white",
-                font=subtitle_font,
-                stroke_color="black",
-                stroke_width=SUBTITLE_STROKE_WIDTH,
-                method="caption",
-                size=(OUTPUT_SIZE[0] - 100, None)
-            ).with_position("center").with_duration(duration).with_start(start_time)
+            # Chunks already fit SUBTITLE_MAX_WIDTH, so each one is a single rendered line
+            image = render_text_image(
+                chunk['text'], subtitle_font, SUBTITLE_FONT_SIZE, "white",
+                stroke_width=SUBTITLE_STROKE_WIDTH, stroke_color="black"
+            )
+            subtitle = ImageClip(image).with_position("center").with_duration(duration).with_start(start_time)
             
             subtitle_clips.append(subtitle)
             print(f"  ✓ Chunk {i+1}: '{chunk['text'][:40]}' at {start_time:.2f}s for {duration:.2f}s")
@@ -442,121 +529,179 @@ def create_subtitle_clips_with_whisper(transcription_result, font_path, title_du
 
 
 def get_font_path():
-    """Find font files, prioritizing a local 'fonts' directory."""
-    result = {'default': None, 'luckiest_guy': None}
-    local_font_dir = "fonts"
-
-    # Define expected font filenames
-    default_font_file = "Arial.ttf"
-    luckiest_guy_font_file = "LuckiestGuy-Regular.ttf" # Adjust if your filename is different
-
-    # Check for local fonts first
-    local_default_path = os.path.join(local_font_dir, default_font_file)
-    if os.path.exists(local_default_path):
-        result['default'] = local_default_path
-
-    local_luckiest_path = os.path.join(local_font_dir, luckiest_guy_font_file)
-    if os.path.exists(local_luckiest_path):
-        result['luckiest_guy'] = local_luckiest_path
-
-    # Fallback for default font if not found locally
-    if not result['default']:
-        # On Linux, moviepy can often find a default font like 'Liberation-Sans'
-        result['default'] = "Arial" # Let moviepy try to find it
-
-    print(f"Using default font: {result['default']}")
-    print(f"Using Luckiest Guy font: {result['luckiest_guy'] or 'NOT FOUND - will use default'}")
-    
-    return result
+    """Font files by role, prioritizing the local 'fonts' directory (resolved once per process)."""
+    return FONT_REGISTRY.font_paths()
+
 
+def create_video_with_minecraft(audio_file, title_text, transcription_result, minecraft_clip_path, title_duration, output_file="final_video.mp4", tiktok_name="MyTikTok", progress=None, normalized=None, thumbnail_file=None, variant_files=None):
+    """
+    Compose the video and encode it, plus any extra variants given as
+    variant_files ({variant name in OUTPUT_VARIANTS: path}), in one pass.
+    Returns the duration in seconds, per-variant encode statistics and the
+    background used ({'path', 'start'}).
+    """
+    from moviepy import AudioFileClip, CompositeVideoClip, VideoFileClip
+    from app.encoder import write_variants
 
-def create_video_with_minecraft(audio_file, title_text, transcription_result, minecraft_clip_path, title_duration, output_file="final_video.mp4", tiktok_name="MyTikTok"):
     audio = AudioFileClip(audio_file)
 
-    # Load and loop Minecraft video to match audio length
-    minecraft_clip = VideoFileClip(minecraft_clip_path)
-    minecraft_clip = loop_video_to_duration(minecraft_clip, audio.duration)
-    minecraft_clip = minecraft_clip.resized(new_size=OUTPUT_SIZE)
+    # Pick a background (BACKGROUND_CLIPS pool, or minecraft_clip_path) and a random
+    # keyframe to start from, so videos don't all open with the same footage.
+    background_path, background_start = BackgroundPool.from_env(minecraft_clip_path).choose(audio.duration)
+    print(f"Using background {background_path} from {background_start:.2f}s")
 
-    # Get font paths
-    font_paths = get_font_path()
-    
-    # Create stylized title card with TikTok handle (only shows during title narration)
-    title_card = create_title_card(title_text, tiktok_name, font_paths, title_duration)
+    # Load and loop Minecraft video to match audio length.
+    # Its own audio track is never used, so don't open it.
+    background_source = VideoFileClip(background_path, audio=False)
+    minecraft_clip = background_source
+    final_clip = None
+    try:
+        minecraft_clip = loop_video_to_duration(background_source, audio.duration, start=background_start)
+        minecraft_clip = minecraft_clip.resized(new_size=OUTPUT_SIZE)
+
+        # Get font paths
+        font_paths = get_font_path()
+
+        # Create stylized title card with TikTok handle (only shows during title narration)
+        title_card = create_title_card(title_text, tiktok_name, font_paths, title_duration)
+
+        # Create synced subtitle clips using Whisper (NEW: uses actual audio timestamps)
+        subtitle_clips = create_subtitle_clips_with_whisper(transcription_result, font_paths, title_duration, normalized)
+
+        # Compose final video
+        all_clips = [minecraft_clip, title_card]
+        all_clips.extend(subtitle_clips)
+
+        # The audio file goes straight to ffmpeg, so the composite needs no audio.
+        # Clamp to the narration so a late subtitle can't add frames past its end.
+        final_clip = CompositeVideoClip(all_clips, size=OUTPUT_SIZE).with_duration(audio.duration)
+        report_progress(progress, 'encode')
+        print(f"Rendering video: {output_file}")
+
+        # Every variant starts from the main encoder settings (see ENCODER_PROFILE)
+        outputs = {'main': (output_file, ENCODER_PROFILE)}
+        for name, path in (variant_files or {}).items():
+            outputs[name] = (path, {**ENCODER_PROFILE, **OUTPUT_VARIANTS[name]})
+        # progress -> Reports per-frame progress (and checks for cancellation) when a callback is given.
+        variant_stats = write_variants(final_clip, audio_file, outputs, fps=OUTPUT_FPS, progress=progress)
+
+        if thumbnail_file:
+            # Grab a frame from the composited clip while the title card is showing;
+            # this avoids decoding the encoded output again.
+            final_clip.save_frame(thumbnail_file, t=min(title_duration / 2, final_clip.duration / 2), with_mask=False)
+
+        background = {'path': background_path, 'start': round(background_start, 3)}
+        return final_clip.duration, variant_stats, background
+    finally:
+        # Clean up clips (also when the render fails or is cancelled)
+        audio.close()
+        minecraft_clip.close()
+        # Derived clips don't own the file reader; close it on the source
+        background_source.close()
+        if final_clip is not None:
+            final_clip.close()
 
-    # Create synced subtitle clips using Whisper (NEW: uses actual audio timestamps)
-    subtitle_clips = create_subtitle_clips_with_whisper(transcription_result, font_paths, title_duration)
 
-    # Compose final video
-    all_clips = [minecraft_clip, title_card]
-    all_clips.extend(subtitle_clips)
-    
-    final_clip = CompositeVideoClip(all_clips, size=OUTPUT_SIZE).with_audio(audio)
-    print(f"Rendering video: {output_file}")
-    # Optimized write_videofile for speed
-    # preset='ultrafast' -> Greatly speeds up encoding at the cost of a larger file size.
-    # threads=8 -> Increase if your CPU has more cores.
-    # logger=None -> Disables the progress bar for a small speed-up.
-    final_clip.write_videofile(output_file, 
-                               fps=24, 
-                               codec='libx264', 
-                               audio_codec='aac', 
-                               threads=10, 
-                               preset='ultrafast')
-    
-    # Clean up clips
-    audio.close()
-    minecraft_clip.close()
-    final_clip.close()
+def make_video_from_script(title_text, narration_script, video_name="final_video.mp4", tiktok_name="MyTikTok", progress=None, thumbnail_name=None, variant_files=None):
+    """
+    Main function to create video from script text.
+
+    `progress`, if given, is called as progress(stage, **info) at each stage
+    and during encoding. It may raise to abort the render.
 
+    `variant_files` maps extra OUTPUT_VARIANTS names to output paths; they are
+    encoded in the same pass as the main video.
 
-def make_video_from_script(title_text, narration_script, video_name="final_video.mp4", tiktok_name="MyTikTok"):
-    """Main function to create video from script text."""
-    # Use a temporary file for the audio to avoid race conditions
+    Returns render metadata: duration, title duration, per-stage timings
+    (seconds), audio processing statistics, the encoder profile, the
+    background clip and start time, and per-variant encode statistics.
+    """
+    from app.audio_processing import process_tts_audio
+
+    timings = {}
+    # Use temporary files for the audio to avoid race conditions
     temp_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
     audio_file_path = temp_audio_file.name
     temp_audio_file.close() # Close the file so other processes can access it
+    temp_processed_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
+    processed_audio_path = temp_processed_file.name
+    temp_processed_file.close()
 
     try:
+        # Normalize the script once: TTS text, Whisper prompt and subtitle text all come from this
+        normalized = normalize_narration(narration_script)
+
         # 1. Generate voiceover
-        generated_path = text_to_speech(narration_script, filename=audio_file_path)
+        report_progress(progress, 'tts')
+        stage_started = time.perf_counter()
+        generated_path = text_to_speech(narration_script, filename=audio_file_path, speech_text=normalized.tts_text)
+        timings['tts'] = time.perf_counter() - stage_started
         if not generated_path:
             print("Skipping video creation due to audio failure.")
             raise IOError("Failed to generate voiceover audio.")
 
-        # 2. Transcribe the audio ONCE to get all word timestamps
+        # 2. Trim silence, shorten long pauses and normalize loudness.
+        # Everything below (Whisper timestamps included) uses the processed audio,
+        # so word timings already match the shortened track.
+        report_progress(progress, 'audio')
+        stage_started = time.perf_counter()
+        audio_stats = process_tts_audio(audio_file_path, processed_audio_path)
+        timings['audio'] = time.perf_counter() - stage_started
+
+        # 3. Transcribe the audio ONCE to get all word timestamps
+        report_progress(progress, 'transcribe')
         print("Performing one-time transcription for timestamps...")
+        stage_started = time.perf_counter()
         model = load_whisper_model()
 
         # Use the same text that was used for audio generation (with abbreviations expanded)
         # to ensure Whisper has the correct text to align with the audio.
-        prompt_text = expand_abbreviations_for_tts(narration_script)
+        prompt_text = normalized.spoken_text
         narration_title = prompt_text.split('\n\n')[0]
 
-        transcription_result = model.transcribe(audio_file_path, word_timestamps=True, language='en', initial_prompt=prompt_text)
+        transcription_result = model.transcribe(processed_audio_path, word_timestamps=True, language='en', initial_prompt=prompt_text)
 
-        # 3. Calculate title duration from the transcription result
+        # 4. Calculate title duration from the transcription result
         title_duration = get_actual_title_duration(transcription_result, narration_title)
+        timings['transcribe'] = time.perf_counter() - stage_started
 
-        # 4. Create video, passing the transcription result to avoid re-processing
-        create_video_with_minecraft(
-            audio_file_path,
+        # 5. Create video, passing the transcription result to avoid re-processing
+        report_progress(progress, 'compose')
+        stage_started = time.perf_counter()
+        duration, variant_stats, background = create_video_with_minecraft(
+            processed_audio_path,
             title_text=title_text,
             transcription_result=transcription_result,
             minecraft_clip_path=MINECRAFT_CLIP,
             title_duration=title_duration,
             output_file=video_name,
-            tiktok_name=tiktok_name
+            tiktok_name=tiktok_name,
+            progress=progress,
+            normalized=normalized,
+            thumbnail_file=thumbnail_name,
+            variant_files=variant_files
         )
+        timings['render'] = time.perf_counter() - stage_started
         
         print(f"✓ Video created successfully: {video_name}")
         print(f"  - Title card duration: {title_duration:.2f}s")
 
+        return {
+            'duration': duration,
+            'title_duration': title_duration,
+            'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+            'audio': audio_stats,
+            'encoder': ENCODER_PROFILE,
+            'background': background,
+            'variants': variant_stats,
+        }
+
     finally:
-        # Ensure temporary audio file is always cleaned up
-        if os.path.exists(audio_file_path):
-            try:
-                os.remove(audio_file_path)
-                print(f"Cleaned up temporary audio file: {audio_file_path}")
-            except OSError as e:
-                print(f"Error removing temporary audio file {audio_file_path}: {e}")
\ No newline at end of file
+        # Ensure temporary audio files are always cleaned up
+        for temp_path in (audio_file_path, processed_audio_path):
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                    print(f"Cleaned up temporary audio file: {temp_path}")
+                except OSError as e:
+                    print(f"Error removing temporary audio file {temp_path}: {e}")
\ No newline at end of file
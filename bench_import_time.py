@@ -0,0 +1,72 @@
+# bench_import_time.py
+"""
+Import-time guard for the web API and the Celery worker.
+
+Imports each entry point in a fresh interpreter, reports the median import
+time, and fails (exit code 1) if it exceeds its budget or pulls in one of the
+heavy rendering modules. Run from the project root:
+
+    python bench_import_time.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that must only be imported inside the functions that render videos.
+HEAVY_MODULES = ["torch", "whisper", "moviepy", "edge_tts", "PIL", "numpy", "praw"]
+
+# (module to import, budget in seconds). Override budgets via .env if needed.
+ENTRY_POINTS = [
+    ("app.main", float(os.getenv("API_IMPORT_BUDGET", "1.5"))),          # gunicorn worker cold start
+    ("app.tasks.tasks", float(os.getenv("WORKER_IMPORT_BUDGET", "1.5"))),  # Celery worker before forking
+]
+
+RUNS = 5
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module):
+    """Import `module` in a fresh interpreter and return (seconds, heavy modules loaded)."""
+    code = PROBE.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["seconds"], result["heavy"]
+
+
+def main():
+    failed = False
+    for module, budget in ENTRY_POINTS:
+        samples = []
+        heavy = []
+        for _ in range(RUNS):
+            seconds, heavy = measure(module)
+            samples.append(seconds)
+        median = statistics.median(samples)
+
+        status = "OK"
+        if heavy:
+            status = f"FAIL (imports {', '.join(heavy)})"
+        elif median > budget:
+            status = f"FAIL (over {budget:.2f}s budget)"
+        failed = failed or status != "OK"
+        print(f"{module:<20} median {median * 1000:7.1f} ms over {RUNS} runs  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from app.narration import NarrationNormalizer, align_words_to_display
+
+
+def transcribe(*words):
+    """Word timestamps as Whisper returns them: 0.3s per word, 0.25s long."""
+    return [{'word': w, 'start': round(i * 0.3, 2), 'end': round(i * 0.3 + 0.25, 2)} for i, w in enumerate(words)]
+
+
+def test_normalize_expands_abbreviations_and_removes_urls():
+    normalized = NarrationNormalizer().normalize("TIFU, see https://example.com imo")
+    assert normalized.display_text == "TIFU, see  imo"
+    assert normalized.spoken_text == "Today I Fucked Up, see  In My Opinion"
+
+
+def test_offset_map_outside_and_inside_expansions():
+    normalized = NarrationNormalizer().normalize("So AITA for leaving?")
+    assert normalized.display_start(0) == 0
+    assert normalized.display_start(len("So Am I")) == len("So ")
+    assert normalized.display_end(len("So Am I the Asshole")) == len("So AITA")
+    assert normalized.display_start(len("So Am I the Asshole ")) == len("So AITA ")
+
+
+def test_expansion_becomes_one_word_spanning_all_spoken_words():
+    normalized = NarrationNormalizer().normalize("So AITA for leaving?")
+    words = transcribe("So", "Am", "I", "the", "asshole", "for", "leaving?")
+    aligned = align_words_to_display(words, normalized)
+
+    assert [w['word'] for w in aligned] == ["So", "AITA", "for", "leaving?"]
+    assert (aligned[1]['start'], aligned[1]['end']) == (words[1]['start'], words[4]['end'])
+    assert (aligned[2]['start'], aligned[2]['end']) == (words[5]['start'], words[5]['end'])
+
+
+def test_trailing_punctuation_stays_on_the_expanded_word():
+    normalized = NarrationNormalizer().normalize("AITA? No.")
+    words = transcribe("Am", "I", "the", "asshole?", "No.")
+    aligned = align_words_to_display(words, normalized)
+
+    assert [w['word'] for w in aligned] == ["AITA?", "No."]
+    assert aligned[0]['end'] == words[3]['end']
+
+
+def test_unmatched_words_keep_their_transcription():
+    normalized = NarrationNormalizer().normalize("Hello there")
+    aligned = align_words_to_display(transcribe("Hello", "world"), normalized)
+    assert [w['word'] for w in aligned] == ["Hello", "world"]
+
+
+def test_words_only_match_whole_spoken_words():
+    normalized = NarrationNormalizer().normalize("I'm at the camera store")
+    aligned = align_words_to_display(transcribe("I", "am", "at", "the", "camera", "store"), normalized)
+    assert "amera" not in [w['word'] for w in aligned]
+    assert [w['word'] for w in aligned][-3:] == ["the", "camera", "store"]
+
+    normalized = NarrationNormalizer().normalize("I have a dog")
+    aligned = align_words_to_display(transcribe("I", "a", "dog"), normalized)
+    assert [w['word'] for w in aligned] == ["I", "a", "dog"]
@@ -0,0 +1,24 @@
+from app.video_maker import SUBTITLE_MIN_DURATION, group_words_into_chunks
+
+
+def word(text, start, end):
+    return {'word': text, 'start': start, 'end': end}
+
+
+def test_chunks_break_on_punctuation_and_pauses():
+    chunks = group_words_into_chunks([
+        word("Hello", 0.0, 0.3), word("there.", 0.3, 0.6),
+        word("After", 0.65, 0.9), word("pause", 2.0, 2.3),
+    ])
+    assert [c['text'] for c in chunks] == ["Hello there.", "After", "pause"]
+
+
+def test_small_gaps_are_closed():
+    chunks = group_words_into_chunks([word("One.", 0.0, 0.5), word("Two", 0.55, 0.8)])
+    assert chunks[0]['end'] == chunks[1]['start'] == 0.55
+
+
+def test_minimum_duration_does_not_overlap_next_chunk():
+    chunks = group_words_into_chunks([word("No.", 2.0, 2.0), word("Really", 2.03, 2.4)])
+    assert chunks[0]['end'] == chunks[1]['start'] == 2.03
+    assert chunks[1]['end'] - chunks[1]['start'] >= SUBTITLE_MIN_DURATION